@@ -1,12 +1,31 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 import pandas as pd
 
-# Leitura dos arquivos
-df_in = pd.read_csv('entradas.csv', sep=';', decimal=',', quotechar='"')
-df_out = pd.read_csv('vendas.csv', sep=';', decimal=',', quotechar='"')
+try:
+    import pyarrow
+    LEITOR_CSV = {'engine': 'pyarrow'}
+except ImportError:  # sem pyarrow, usa o leitor C sem inferência em blocos
+    LEITOR_CSV = {'engine': 'c', 'low_memory': False, 'cache_dates': True}
+
+COLUNAS = ['DATA', 'HORA', 'QUANTIDADE', 'DESCCOMPLETA']
+# Descrições repetidas viram categoria: cada texto é guardado uma vez e o groupby usa os códigos.
+# QUANTIDADE segue em float64 porque a alocação repete as subtrações do laço original, e em
+# float32 os pesos alocados já mudariam na casa dos centésimos de kg
+TIPOS = {'DATA': 'str', 'HORA': 'str', 'QUANTIDADE': 'float64', 'DESCCOMPLETA': 'category'}
+
+
+def ler_csv(arquivo):
+    """Lê um CSV de movimentações com as colunas e tipos já definidos"""
+    return pd.read_csv(arquivo, sep=';', decimal=',', quotechar='"', usecols=COLUNAS, dtype=TIPOS,
+                       **LEITOR_CSV)
+
 
-# Converter colunas numéricas
-df_in['QUANTIDADE'] = pd.to_numeric(df_in['QUANTIDADE'], errors='coerce')
-df_out['QUANTIDADE'] = pd.to_numeric(df_out['QUANTIDADE'], errors='coerce')
+# Leitura dos arquivos em paralelo; o parser libera o GIL e as leituras se sobrepõem
+with ThreadPoolExecutor(max_workers=2) as executor:
+    df_in, df_out = executor.map(ler_csv, ['entradas.csv', 'vendas.csv'])
 
 # Converter datas
 df_in['DATA'] = pd.to_datetime(df_in['DATA'], format='%d/%m/%y')
@@ -16,61 +35,97 @@ df_out['DATA'] = pd.to_datetime(df_out['DATA'], format='%d/%m/%y')
 df_in['HORA'] = df_in['HORA'].astype(str).str.zfill(8)
 df_out['HORA'] = df_out['HORA'].astype(str).str.zfill(8)
 
-# Criar datetime completo
-df_in['DATETIME'] = pd.to_datetime(df_in['DATA'].dt.strftime('%Y-%m-%d') + ' ' + df_in['HORA'])
-df_out['DATETIME'] = pd.to_datetime(df_out['DATA'].dt.strftime('%Y-%m-%d') + ' ' + df_out['HORA'])
+# Criar datetime completo somando a hora (HH:MM:SS) à data, sem formatar e reinterpretar texto
+df_in['DATETIME'] = df_in['DATA'] + pd.to_timedelta(df_in['HORA'])
+df_out['DATETIME'] = df_out['DATA'] + pd.to_timedelta(df_out['HORA'])
 
 # Ordenar cronologicamente
 in_sorted = df_in.sort_values('DATETIME').reset_index(drop=True)
 out_sorted = df_out.sort_values('DATETIME').reset_index(drop=True)
 
 # Alocação FIFO
-alloc = []
-entry_idx = 0
-remain = in_sorted.loc[entry_idx, 'QUANTIDADE']
-
-for _, out_row in out_sorted.iterrows():
-    need = out_row['QUANTIDADE']
-    while need > 1e-9 and entry_idx < len(in_sorted):
-        take = min(need, remain)
-        alloc.append({
-            'ENTRY_IDX': entry_idx,
-            'ENTRY_DATE': in_sorted.loc[entry_idx, 'DATA'],
-            'ENTRY_QTY': in_sorted.loc[entry_idx, 'QUANTIDADE'],
-            'OUT_DATE': out_row['DATA'],
-            'CUT_CODE': out_row['SEQPRODUTO'],
-            'CUT_DESC': out_row['DESCCOMPLETA'],
-            'ALLOC_KG': take
-        })
-        need -= take
-        remain -= take
-        if remain <= 1e-9:
-            entry_idx += 1
-            if entry_idx < len(in_sorted):
-                remain = in_sorted.loc[entry_idx, 'QUANTIDADE']
-
-# Criar DataFrame de alocação
-alloc_df = pd.DataFrame(alloc)
-
-# Calcular sumário por entrada
-summary = alloc_df.groupby(['ENTRY_IDX', 'ENTRY_DATE', 'CUT_DESC'])['ALLOC_KG'].sum().reset_index()
-summary = summary.merge(alloc_df[['ENTRY_IDX', 'ENTRY_QTY']].drop_duplicates(), on='ENTRY_IDX')
+# Colunas extraídas como arrays para a alocação não passar pelo indexador do pandas
+in_qty = in_sorted['QUANTIDADE'].to_numpy(dtype='float64')
+in_dates = in_sorted['DATA'].to_numpy()
+out_qty = out_sorted['QUANTIDADE'].to_numpy(dtype='float64')
+cut_descs = out_sorted['DESCCOMPLETA'].array  # mantém os códigos da categoria
+
+# Vendas com quantidade até 1e-9 não consomem nenhuma entrada
+out_idx = np.flatnonzero(out_qty > 1e-9)
+need_qty = out_qty[out_idx]
+
+# Cada entrada atende as vendas seguintes até se esgotar. O saldo após cada venda sai de
+# np.subtract.accumulate, com as subtrações na mesma ordem do laço venda a venda, então os
+# pesos alocados são os mesmos; a janela de vendas dobra enquanto a entrada não se esgota
+alloc_entry, alloc_out, alloc_kg = [], [], []
+pos = 0
+need = need_qty[0] if len(need_qty) else 0.0
+for entry_idx, remain in enumerate(in_qty.tolist()):
+    if pos >= len(need_qty):
+        break
+    window = 64
+    while True:
+        needs = np.concatenate(([need], need_qty[pos + 1:pos + window]))
+        remains = np.subtract.accumulate(np.concatenate(([remain], needs)))
+        exhausted = np.flatnonzero(remains[1:] <= 1e-9)
+        if len(exhausted) or pos + window >= len(need_qty):
+            break
+        window *= 2
+
+    first = pos
+    if len(exhausted) == 0:
+        # As vendas acabaram antes da entrada
+        takes = needs
+        pos = len(need_qty)
+    else:
+        last = int(exhausted[0])
+        takes = needs[:last + 1].copy()
+        pos += last + 1
+        need = need_qty[pos] if pos < len(need_qty) else 0.0
+        if needs[last] > remains[last]:
+            # A venda leva o resto da entrada; se ainda faltar peso, continua na próxima
+            takes[last] = remains[last]
+            left = needs[last] - remains[last]
+            if left > 1e-9:
+                pos -= 1
+                need = left
+    alloc_entry.append(np.full(len(takes), entry_idx))
+    alloc_out.append(out_idx[first:first + len(takes)])
+    alloc_kg.append(takes)
+
+alloc_entry = np.concatenate(alloc_entry) if alloc_entry else np.empty(0, dtype='int64')
+alloc_out = np.concatenate(alloc_out) if alloc_out else np.empty(0, dtype='int64')
+alloc_kg = np.concatenate(alloc_kg) if alloc_kg else np.empty(0, dtype='float64')
+
+# Calcular sumário por entrada direto dos pares, sem montar a tabela de alocação;
+# data e peso da entrada dependem só do índice e são buscados depois da soma
+alloc_sum = pd.Series(alloc_kg).groupby([alloc_entry, cut_descs[alloc_out]], observed=True).sum()
+summary_idx = alloc_sum.index.get_level_values(0).to_numpy()
+summary = pd.DataFrame({
+    'ENTRY_IDX': summary_idx,
+    'ENTRY_DATE': in_dates[summary_idx],
+    'CUT_DESC': alloc_sum.index.get_level_values(1),
+    'ALLOC_KG': alloc_sum.to_numpy(),
+    'ENTRY_QTY': in_qty[summary_idx],
+})
 summary['PERCENT'] = summary['ALLOC_KG'] / summary['ENTRY_QTY'] * 100
 
-print("\nCortes por entrada (em percentual do peso total):\n")
-for entry_idx in summary['ENTRY_IDX'].unique():
-    entry_data = summary[summary['ENTRY_IDX'] == entry_idx].sort_values('PERCENT', ascending=False)
+# A saída é montada em memória e escrita de uma só vez
+lines = ["\nCortes por entrada (em percentual do peso total):\n"]
+for entry_idx, entry_data in summary.groupby('ENTRY_IDX', sort=True):
+    entry_data = entry_data.sort_values('PERCENT', ascending=False)
     entry_date = entry_data['ENTRY_DATE'].iloc[0].strftime('%d/%m/%Y')
     total_allocated = entry_data['ALLOC_KG'].sum()
     total_qty = entry_data['ENTRY_QTY'].iloc[0]
 
-    print(f"\nEntrada {entry_idx} - Data: {entry_date}")
-    print(f"Peso total: {total_qty:.2f} kg")
-    print(f"Peso alocado: {total_allocated:.2f} kg ({(total_allocated/total_qty*100):.2f}%)")
-    print("\nTodos os cortes:")
+    lines.append(f"\nEntrada {entry_idx} - Data: {entry_date}")
+    lines.append(f"Peso total: {total_qty:.2f} kg")
+    lines.append(f"Peso alocado: {total_allocated:.2f} kg ({(total_allocated/total_qty*100):.2f}%)")
+    lines.append("\nTodos os cortes:")
 
-    for _, row in entry_data.iterrows():
-        print(f"{row['CUT_DESC']}: {row['PERCENT']:.2f}%")
+    for cut_desc, percent in zip(entry_data['CUT_DESC'].tolist(), entry_data['PERCENT'].tolist()):
+        lines.append(f"{cut_desc}: {percent:.2f}%")
+sys.stdout.write("\n".join(lines) + "\n")
 
 def obter_maior_porcentagem_por_produto():
     """
@@ -79,13 +134,14 @@ def obter_maior_porcentagem_por_produto():
     Returns:
         pandas.Series: Série com as maiores porcentagens por produto
     """
-    return summary.groupby('CUT_DESC')['PERCENT'].max().sort_values(ascending=False)
+    return summary.groupby('CUT_DESC', observed=True)['PERCENT'].max().sort_values(ascending=False)
 
 # Salvar resultados em CSV
 summary.to_csv('analise_cortes.csv', index=False, sep=';', decimal=',', encoding='utf-8-sig')
 
-print("\n Maior porcentagem por produto: ")
 maiores_porcentagens = obter_maior_porcentagem_por_produto()
+lines = ["\n Maior porcentagem por produto: "]
 for produto, porcentagem in maiores_porcentagens.items():
-    print(f"{produto}: {porcentagem:.2f}%")
-print(maiores_porcentagens.sum())
\ No newline at end of file
+    lines.append(f"{produto}: {porcentagem:.2f}%")
+lines.append(str(maiores_porcentagens.sum()))
+sys.stdout.write("\n".join(lines) + "\n")
\ No newline at end of file
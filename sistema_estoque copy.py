@@ -1,10 +1,20 @@
-import csv
-from dataclasses import dataclass
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
 from typing import Dict, List
 from datetime import datetime
+from operator import attrgetter
 
+import numpy as np
+import pandas as pd
 
-@dataclass
+
+def _ler_csv(arquivo: str, **opcoes) -> pd.DataFrame:
+    """Lê um CSV no formato exportado (separador ';' e vírgula decimal)"""
+    return pd.read_csv(arquivo, sep=';', decimal=',', encoding='utf-8', na_filter=False, **opcoes)
+
+
+@dataclass(slots=True)
 class Movimentacao:
     data: datetime
     tipo: str  # 'E' para entrada, 'S' para saída
@@ -12,7 +22,7 @@ class Movimentacao:
     saldo_apos: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Produto:
     codigo: int
     descricao: str
@@ -21,59 +31,69 @@ class Produto:
     movimentacoes: List[Movimentacao] = None
     tentativa_venda_negativa: bool = False
     total_falta_estoque: float = 0.0
-    vendas_negativas_por_dia: Dict[datetime, int] = None
+    vendas_negativas_por_dia: Dict[int, int] = None  # chave: data.toordinal()
     dia_mais_vendas_negativas: datetime = None
     qtd_vendas_negativas_no_dia: int = 0
     falta_no_dia_mais_vendas_negativas: float = 0.0
+    coletar_historico: bool = True  # sem histórico, só saldos e totais são mantidos
+    # Totais acumulados a cada registro, sem percorrer as movimentações
+    _total_entradas: float = field(default=0.0, init=False, repr=False)
+    _total_saidas: float = field(default=0.0, init=False, repr=False)
 
     def __post_init__(self):
         self.movimentacoes = []
-        self.vendas_negativas_por_dia = {}
+        self.vendas_negativas_por_dia = defaultdict(int)
 
     def registrar_entrada(self, data: datetime, quantidade: float):
         self.saldo_atual += quantidade
-        self.movimentacoes.append(
-            Movimentacao(data, 'E', quantidade, self.saldo_atual)
-        )
+        self._total_entradas += quantidade
+        if self.coletar_historico:
+            self.movimentacoes.append(
+                Movimentacao(data, 'E', quantidade, self.saldo_atual)
+            )
 
     def registrar_saida(self, data: datetime, quantidade: float) -> bool:
         if self.saldo_atual >= quantidade:
             self.saldo_atual -= quantidade
-            self.movimentacoes.append(
-                Movimentacao(data, 'S', quantidade, self.saldo_atual)
-            )
+            self._total_saidas += quantidade
+            if self.coletar_historico:
+                self.movimentacoes.append(
+                    Movimentacao(data, 'S', quantidade, self.saldo_atual)
+                )
             return True
         else:
             self.tentativa_venda_negativa = True
             falta = quantidade - self.saldo_atual
             self.total_falta_estoque += falta
             
-            # Registra a tentativa de venda negativa do dia
-            data_sem_hora = datetime(data.year, data.month, data.day)
-            self.vendas_negativas_por_dia[data_sem_hora] = self.vendas_negativas_por_dia.get(data_sem_hora, 0) + 1
+            # Registra a tentativa de venda negativa do dia (chave ordinal, sem montar datetime)
+            dia = data.toordinal()
+            self.vendas_negativas_por_dia[dia] += 1
             
             # Atualiza o dia com mais vendas negativas e a falta total nesse dia
-            qtd_atual = self.vendas_negativas_por_dia[data_sem_hora]
+            qtd_atual = self.vendas_negativas_por_dia[dia]
             if self.dia_mais_vendas_negativas is None or qtd_atual > self.qtd_vendas_negativas_no_dia:
-                self.dia_mais_vendas_negativas = data_sem_hora
+                self.dia_mais_vendas_negativas = datetime(data.year, data.month, data.day)
                 self.qtd_vendas_negativas_no_dia = qtd_atual
                 self.falta_no_dia_mais_vendas_negativas = falta
-            elif self.dia_mais_vendas_negativas == data_sem_hora:
+            elif self.dia_mais_vendas_negativas.toordinal() == dia:
                 self.falta_no_dia_mais_vendas_negativas += falta
             
             return False
 
     @property
     def total_entradas(self) -> float:
-        return sum(m.quantidade for m in self.movimentacoes if m.tipo == 'E')
+        return self._total_entradas
 
     @property
     def total_saidas(self) -> float:
-        return sum(m.quantidade for m in self.movimentacoes if m.tipo == 'S')
+        return self._total_saidas
 
 
 class ControladorEstoque:
-    def __init__(self):
+    def __init__(self, coletar_historico: bool = False):
+        # O histórico por produto só é necessário para gerar_relatorio_movimentacoes
+        self.coletar_historico = coletar_historico
         self.produtos: Dict[int, Produto] = {}
         self.produto_base_codigo = 25274
         self.produto_base_descricao = "CARNE BOV RSF KG"
@@ -89,42 +109,59 @@ class ControladorEstoque:
     
     def carregar_produtos_e_percentuais(self):
         """Carrega os produtos e seus percentuais de rendimento"""
-        with open('percentuais_v2.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                codigo = int(row['SEQPRODUTO'])
-                descricao = row['DESCCOMPLETA']
-                percentual = float(row['PERCENTUAL'].replace(',', '.'))
-                self.produtos[codigo] = Produto(codigo, descricao, percentual)
+        df = _ler_csv('percentuais_v2.csv', usecols=['SEQPRODUTO', 'DESCCOMPLETA', 'PERCENTUAL'],
+                      dtype={'SEQPRODUTO': 'int64', 'DESCCOMPLETA': str, 'PERCENTUAL': 'float64'})
+        for codigo, descricao, percentual in zip(df['SEQPRODUTO'].tolist(), df['DESCCOMPLETA'].tolist(),
+                                                 df['PERCENTUAL'].tolist()):
+            self.produtos[codigo] = Produto(codigo, descricao, percentual,
+                                            coletar_historico=self.coletar_historico)
+        # Ordem por código calculada uma vez para o relatório
+        self._produtos_por_codigo = sorted(self.produtos.values(), key=attrgetter('codigo'))
 
     def carregar_movimentacoes(self):
         """Carrega todas as movimentações (entradas e saídas) e ordena por data"""
         # Carrega entradas
-        entradas = []
-        with open('entradas_v2.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                data = datetime.strptime(row['DATA'], '%d/%m/%y')
-                quantidade = float(row['QUANTIDADE'].replace(',', '.'))
-                # Remove a hora da data para comparação
-                data_sem_hora = datetime(data.year, data.month, data.day)
-                entradas.append(('E', data, quantidade, None))
-                self.entrada_total += quantidade
-                self.entradas_por_data[data_sem_hora] = quantidade
+        df = _ler_csv('entradas_v2.csv', usecols=['DATA', 'QUANTIDADE'],
+                      parse_dates=['DATA'], date_format='%d/%m/%y', dtype={'QUANTIDADE': 'float64'})
+        # Arquivo só com cabeçalho deixa DATA como texto; a conversão garante o tipo datetime
+        df['DATA'] = pd.to_datetime(df['DATA'], format='%d/%m/%y')
+        datas = df['DATA'].to_numpy('datetime64[us]').tolist()
+        quantidades = df['QUANTIDADE'].tolist()
+        entradas = [('E', data, quantidade, None) for data, quantidade in zip(datas, quantidades)]
+        datas_entradas = df['DATA'].to_numpy('datetime64[s]')
+        # Soma na ordem do arquivo, como o acumulado anterior
+        self.entrada_total += sum(quantidades)
+        # Quando há mais de uma entrada no dia, vale a última do arquivo
+        ultimas = df.groupby(df['DATA'].dt.normalize())['QUANTIDADE'].last()
+        self.entradas_por_data.update(zip(ultimas.index.to_numpy('datetime64[us]').tolist(), ultimas.tolist()))
+
+        # Carrega vendas apenas dos produtos conhecidos
+        df = _ler_csv('vendas_v2.csv', usecols=['DATA', 'SEQPRODUTO', 'QUANTIDADE'],
+                      parse_dates=['DATA'], date_format='%d/%m/%y',
+                      dtype={'SEQPRODUTO': 'int64', 'QUANTIDADE': 'float64'})
+        df['DATA'] = pd.to_datetime(df['DATA'], format='%d/%m/%y')
+        df = df[df['SEQPRODUTO'].isin(self.produtos.keys())]
+        datas_vendas = df['DATA'].to_numpy('datetime64[s]')
+        vendas = [('S', data, quantidade, codigo)
+                  for data, quantidade, codigo in zip(df['DATA'].to_numpy('datetime64[us]').tolist(),
+                                                      df['QUANTIDADE'].tolist(), df['SEQPRODUTO'].tolist())]
 
-        # Carrega vendas
-        vendas = []
-        with open('vendas_v2.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                data = datetime.strptime(row['DATA'], '%d/%m/%y')
-                codigo = int(row['SEQPRODUTO'])
-                quantidade = float(row['QUANTIDADE'].replace(',', '.'))
-                if codigo in self.produtos:
-                    vendas.append(('S', data, quantidade, codigo))
+        # Combina e ordena por data: as vendas são anexadas à lista de entradas, e a ordenação
+        # estável das datas do pandas mantém as entradas antes das vendas do mesmo dia
+        datas = np.concatenate([datas_entradas, datas_vendas])
+        movimentacoes = entradas
+        movimentacoes.extend(vendas)
+        if (datas[1:] >= datas[:-1]).all():
+            # Já em ordem cronológica: dispensa a ordenação
+            self.movimentacoes_ordenadas = movimentacoes
+        else:
+            ordem = np.argsort(datas, kind='stable')
+            self.movimentacoes_ordenadas = [movimentacoes[i] for i in ordem.tolist()]
 
-        # Combina e ordena todas as movimentações por data
-        self.movimentacoes_ordenadas = sorted(entradas + vendas, key=lambda x: x[1])
+        # Datas de entrada ordenadas para a busca binária da entrada anterior
+        datas_entrada = sorted(self.entradas_por_data)
+        self._datas_entrada = np.array(datas_entrada, dtype='datetime64[D]')
+        self._valores_entrada = [self.entradas_por_data[d] for d in datas_entrada]
 
     def encontrar_entrada_do_dia(self, data: datetime) -> float:
         """Encontra a entrada do dia especificado ou do dia mais próximo anterior"""
@@ -135,21 +172,22 @@ class ControladorEstoque:
             return self.entradas_por_data[data_sem_hora]
         
         # Se não encontrar, procura a entrada mais próxima anterior
-        datas_anteriores = [d for d in self.entradas_por_data.keys() if d < data_sem_hora]
-        if datas_anteriores:
-            data_mais_proxima = max(datas_anteriores)
-            return self.entradas_por_data[data_mais_proxima]
+        posicao = int(np.searchsorted(self._datas_entrada, np.datetime64(data_sem_hora, 'D'))) - 1
+        if posicao >= 0:
+            return self._valores_entrada[posicao]
         
         return 0.0  # Retorna 0 se não encontrar nenhuma entrada anterior
 
     def processar_movimentacoes(self):
         """Processa todas as movimentações em ordem cronológica"""
+        # Percentual e método de registro resolvidos uma única vez por produto
+        distribuicao = tuple((produto.percentual, produto.registrar_entrada)
+                             for produto in self.produtos.values())
         for tipo, data, quantidade, codigo in self.movimentacoes_ordenadas:
             if tipo == 'E':
                 # Entrada do boi casado - distribui para os produtos
-                for produto in self.produtos.values():
-                    quantidade_derivada = (quantidade * produto.percentual) / 100
-                    produto.registrar_entrada(data, quantidade_derivada)
+                for percentual, registrar_entrada in distribuicao:
+                    registrar_entrada(data, (quantidade * percentual) / 100)
             else:
                 # Venda de produto específico
                 produto = self.produtos[codigo]
@@ -170,103 +208,113 @@ class ControladorEstoque:
                     
     def gerar_relatorio(self):
         """Gera um relatório completo do estoque"""
-        print("\nRELATÓRIO DE ESTOQUE - CARNES BOVINAS")
-        print("=" * 100)
+        # O relatório é montado em memória e escrito de uma só vez
+        linhas = []
+        linhas.append("\nRELATÓRIO DE ESTOQUE - CARNES BOVINAS")
+        linhas.append("=" * 100)
         
         # Informações do produto base
-        print("\nPRODUTO BASE:")
-        print(f"Código: {self.produto_base_codigo}")
-        print(f"Descrição: {self.produto_base_descricao}")
-        print(f"Quantidade Total Entrada: {self.entrada_total:.3f} kg")
+        linhas.append("\nPRODUTO BASE:")
+        linhas.append(f"Código: {self.produto_base_codigo}")
+        linhas.append(f"Descrição: {self.produto_base_descricao}")
+        linhas.append(f"Quantidade Total Entrada: {self.entrada_total:.3f} kg")
         
         # Informações dos produtos derivados
-        print("\nPRODUTOS DERIVADOS:")
-        print("-" * 100)
-        print(f"{'Código':<10} {'Descrição':<40} {'Percentual':<10} {'Entradas':<12} {'Saídas':<12} {'Saldo':<12}")
-        print("-" * 100)
+        linhas.append("\nPRODUTOS DERIVADOS:")
+        linhas.append("-" * 100)
+        linhas.append(f"{'Código':<10} {'Descrição':<40} {'Percentual':<10} {'Entradas':<12} {'Saídas':<12} {'Saldo':<12}")
+        linhas.append("-" * 100)
         
         total_percentual = 0
         total_entradas = 0
         total_saidas = 0
         total_saldo = 0
         
-        for produto in sorted(self.produtos.values(), key=lambda x: x.codigo):
-            print(f"{produto.codigo:<10} "
-                  f"{produto.descricao[:40]:<40} "
-                  f"{produto.percentual:>9.2f}% "
-                  f"{produto.total_entradas:>11.2f} "
-                  f"{produto.total_saidas:>11.2f} "
-                  f"{produto.saldo_atual:>11.2f}")
+        for produto in self._produtos_por_codigo:
+            linhas.append(f"{produto.codigo:<10} "
+                          f"{produto.descricao[:40]:<40} "
+                          f"{produto.percentual:>9.2f}% "
+                          f"{produto.total_entradas:>11.2f} "
+                          f"{produto.total_saidas:>11.2f} "
+                          f"{produto.saldo_atual:>11.2f}")
             
             total_percentual += produto.percentual
             total_entradas += produto.total_entradas
             total_saidas += produto.total_saidas
             total_saldo += produto.saldo_atual
         
-        print("-" * 100)
-        print(f"{'TOTAL':<51} "
-              f"{total_percentual:>9.2f}% "
-              f"{total_entradas:>11.2f} "
-              f"{total_saidas:>11.2f} "
-              f"{total_saldo:>11.2f}")
+        linhas.append("-" * 100)
+        linhas.append(f"{'TOTAL':<51} "
+                      f"{total_percentual:>9.2f}% "
+                      f"{total_entradas:>11.2f} "
+                      f"{total_saidas:>11.2f} "
+                      f"{total_saldo:>11.2f}")
         
         # Encontra o produto com maior saldo
-        produto_maior_saldo = max(self.produtos.values(), key=lambda p: p.saldo_atual)
-        print("\nPRODUTO COM MAIOR SALDO:")
-        print(f"Código: {produto_maior_saldo.codigo}")
-        print(f"Descrição: {produto_maior_saldo.descricao}")
-        print(f"Saldo atual: {produto_maior_saldo.saldo_atual:.3f} kg")
+        produto_maior_saldo = max(self.produtos.values(), key=attrgetter('saldo_atual'))
+        linhas.append("\nPRODUTO COM MAIOR SALDO:")
+        linhas.append(f"Código: {produto_maior_saldo.codigo}")
+        linhas.append(f"Descrição: {produto_maior_saldo.descricao}")
+        linhas.append(f"Saldo atual: {produto_maior_saldo.saldo_atual:.3f} kg")
 
         # Validações e alertas
-        print("\nVALIDAÇÕES E ALERTAS:")
+        linhas.append("\nVALIDAÇÕES E ALERTAS:")
         if abs(total_percentual - 100) > 0.01:
-            print(f"ALERTA: Soma dos percentuais ({total_percentual:.3f}%) não totaliza 100%")
+            linhas.append(f"ALERTA: Soma dos percentuais ({total_percentual:.3f}%) não totaliza 100%")
         
         produtos_negativos = [p for p in self.produtos.values() if p.saldo_atual < 0]
         if produtos_negativos:
-            print("\nALERTA: Produtos com saldo negativo:")
+            linhas.append("\nALERTA: Produtos com saldo negativo:")
             for produto in produtos_negativos:
-                print(f"- {produto.codigo} {produto.descricao}: {produto.saldo_atual:.3f} kg")
+                linhas.append(f"- {produto.codigo} {produto.descricao}: {produto.saldo_atual:.3f} kg")
         
         produtos_tentativa_negativa = [p for p in self.produtos.values() if p.tentativa_venda_negativa]
         if produtos_tentativa_negativa:
-            print("\nALERTA: Produtos com tentativas de venda com estoque insuficiente:")
+            linhas.append("\nALERTA: Produtos com tentativas de venda com estoque insuficiente:")
             for produto in produtos_tentativa_negativa:
                 total_falta = getattr(produto, 'total_falta_estoque', 0)
-                print(f"- {produto.codigo} {produto.descricao}")
-                print(f"  Total de quantidade faltante: {total_falta:.3f} kg")
+                linhas.append(f"- {produto.codigo} {produto.descricao}")
+                linhas.append(f"  Total de quantidade faltante: {total_falta:.3f} kg")
                 if produto.dia_mais_vendas_negativas:
-                    print(f"  Dia com mais tentativas de vendas negativas: {produto.dia_mais_vendas_negativas.strftime('%d/%m/%y')}")
-                    print(f"  Quantidade de tentativas neste dia: {produto.qtd_vendas_negativas_no_dia}")
-                    print(f"  Total faltante neste dia: {produto.falta_no_dia_mais_vendas_negativas:.3f} kg")
+                    linhas.append(f"  Dia com mais tentativas de vendas negativas: {produto.dia_mais_vendas_negativas.strftime('%d/%m/%y')}")
+                    linhas.append(f"  Quantidade de tentativas neste dia: {produto.qtd_vendas_negativas_no_dia}")
+                    linhas.append(f"  Total faltante neste dia: {produto.falta_no_dia_mais_vendas_negativas:.3f} kg")
                     # Encontra a entrada correspondente ao dia com mais vendas negativas
                     entrada_do_dia = self.encontrar_entrada_do_dia(produto.dia_mais_vendas_negativas)
-                    print(entrada_do_dia)
+                    linhas.append(str(entrada_do_dia))
                     if entrada_do_dia > 0:
                         # porcentagem = (produto.falta_no_dia_mais_vendas_negativas / entrada_do_dia) * 100
                         porcentagem = (total_falta / entrada_do_dia) * 100
-                        print(f"  Porcentagem em relação à entrada do dia: {porcentagem:.2f}%")
+                        linhas.append(f"  Porcentagem em relação à entrada do dia: {porcentagem:.2f}%")
+
+        sys.stdout.write("\n".join(linhas) + "\n")
 
     def gerar_relatorio_movimentacoes(self, codigo_produto: int = None):
         """Gera um relatório detalhado das movimentações de um produto específico"""
         if codigo_produto is not None and codigo_produto not in self.produtos:
             print(f"Produto {codigo_produto} não encontrado!")
             return
+        if not self.coletar_historico:
+            print("Histórico não coletado: crie o controlador com coletar_historico=True")
+            return
 
         produtos = [self.produtos[codigo_produto]] if codigo_produto else self.produtos.values()
         
+        linhas = []
         for produto in produtos:
-            print(f"\nMovimentações do produto {produto.codigo} - {produto.descricao}")
-            print("-" * 80)
-            print(f"{'Data':<12} {'Tipo':<8} {'Quantidade':>12} {'Saldo':>12}")
-            print("-" * 80)
+            linhas.append(f"\nMovimentações do produto {produto.codigo} - {produto.descricao}")
+            linhas.append("-" * 80)
+            linhas.append(f"{'Data':<12} {'Tipo':<8} {'Quantidade':>12} {'Saldo':>12}")
+            linhas.append("-" * 80)
             
             for mov in produto.movimentacoes:
-                print(f"{mov.data.strftime('%d/%m/%y'):<12} "
-                      f"{mov.tipo:<8} "
-                      f"{mov.quantidade:>12.3f} "
-                      f"{mov.saldo_apos:>12.3f}")
-            print("-" * 80)
+                linhas.append(f"{mov.data.strftime('%d/%m/%y'):<12} "
+                              f"{mov.tipo:<8} "
+                              f"{mov.quantidade:>12.3f} "
+                              f"{mov.saldo_apos:>12.3f}")
+            linhas.append("-" * 80)
+        if linhas:
+            sys.stdout.write("\n".join(linhas) + "\n")
 
 
 if __name__ == "__main__":
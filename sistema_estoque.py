@@ -1,11 +1,72 @@
-import csv
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from typing import Dict, List
 from datetime import datetime
 import math
+from functools import cache
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
+import pandas as pd
 
-@dataclass
+try:
+    import pyarrow
+    LEITOR_CSV = {'engine': 'pyarrow'}
+except ImportError:  # sem pyarrow, o leitor C mapeia o arquivo em memória
+    LEITOR_CSV = {'engine': 'c', 'memory_map': True}
+
+# Registro das movimentações ordenadas (tipo: 0 = entrada, 1 = saída;
+# indice: posição do produto vendido, -1 nas entradas)
+DTYPE_MOVIMENTACAO = np.dtype([('data', 'datetime64[D]'), ('tipo', 'u1'),
+                               ('quantidade', 'f8'), ('indice', 'i4')])
+
+# Abaixo deste número de movimentações o processamento por blocos do NumPy é mais rápido que
+# importar o numba e carregar o laço compilado (~430 ms para ganhar ~0,65 µs por movimentação)
+MIN_MOVIMENTACOES_COMPILADO = 700_000
+
+
+def _processar_movimentacoes_compilado(tipos, quantidades, indices, percentuais, saldos,
+                                       entradas_totais, saidas_totais):
+    """
+    Percorre as movimentações atualizando os vetores de saldos e totais.
+
+    Returns:
+        Posições e saldos das vendas sem estoque suficiente, em ordem cronológica
+    """
+    alertas = np.empty(len(tipos), dtype=np.int64)
+    saldos_alerta = np.empty(len(tipos), dtype=np.float64)
+    n_alertas = 0
+    for k in range(len(tipos)):
+        quantidade = quantidades[k]
+        if tipos[k] == 0:
+            for i in range(len(percentuais)):
+                derivada = quantidade * percentuais[i] / 100
+                saldos[i] += derivada
+                entradas_totais[i] += derivada
+        else:
+            i = indices[k]
+            saldo_disponivel = saldos[i]
+            saldos[i] -= quantidade
+            saidas_totais[i] += quantidade
+            if quantidade > saldo_disponivel:
+                alertas[n_alertas] = k
+                saldos_alerta[n_alertas] = saldos[i]
+                n_alertas += 1
+    return alertas[:n_alertas], saldos_alerta[:n_alertas]
+
+
+@cache
+def _laco_compilado():
+    """Compila (ou carrega do cache) o laço com numba; None quando o numba não está instalado"""
+    try:
+        from numba import njit
+    except ImportError:  # numba é opcional; sem ele o processamento usa só NumPy
+        return None
+    return njit(cache=True)(_processar_movimentacoes_compilado)
+
+
+@dataclass(slots=True)
 class Movimentacao:
     data: datetime
     tipo: str  # 'E' para entrada, 'S' para saída
@@ -13,43 +74,65 @@ class Movimentacao:
     saldo_apos: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class Produto:
     codigo: int
     descricao: str
     percentual: float = 0.0
     saldo_atual: float = 0.0
-    movimentacoes: List[Movimentacao] = None
+    # Totais preenchidos pelo processamento, fora do construtor
+    total_entradas: float = field(default=0.0, init=False)
+    total_saidas: float = field(default=0.0, init=False)
     maior_falta_estoque: float = 0.0
     data_maior_falta_estoque: datetime = None
     percentual_ideal: float = 0.0
-    
-    def __post_init__(self):
-        self.movimentacoes = []
+    # Histórico em colunas paralelas (tipo: 0 = entrada, 1 = saída), preenchido por
+    # registrar_entrada/registrar_saida ou por ControladorEstoque.historico
+    datas: np.ndarray = field(default_factory=lambda: np.empty(0, dtype='datetime64[D]'),
+                              init=False, repr=False, compare=False)
+    tipos: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.uint8),
+                              init=False, repr=False, compare=False)
+    quantidades: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64),
+                                    init=False, repr=False, compare=False)
+    saldos_apos: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64),
+                                    init=False, repr=False, compare=False)
 
     def registrar_entrada(self, data: datetime, quantidade: float):
         self.saldo_atual += quantidade
-        self.movimentacoes.append(
-            Movimentacao(data, 'E', quantidade, self.saldo_atual)
-        )
+        self.total_entradas += quantidade
+        self._anexar(data, 0, quantidade)
     
     def registrar_saida(self, data: datetime, quantidade: float) -> bool:
         flag = True
         if quantidade > self.saldo_atual:
             flag = False
         self.saldo_atual -= quantidade
-        self.movimentacoes.append(
-            Movimentacao(data, 'S', quantidade, self.saldo_atual)
-        )
+        self.total_saidas += quantidade
+        self._anexar(data, 1, quantidade)
         return flag
-    
-    @property
-    def total_entradas(self) -> float:
-        return sum(m.quantidade for m in self.movimentacoes if m.tipo == 'E')
+
+    def _anexar(self, data: datetime, tipo: int, quantidade: float):
+        """Acrescenta uma movimentação ao fim do histórico, com o saldo já atualizado"""
+        self.datas = np.append(self.datas, np.datetime64(data, 'D'))
+        self.tipos = np.append(self.tipos, np.uint8(tipo))
+        self.quantidades = np.append(self.quantidades, quantidade)
+        self.saldos_apos = np.append(self.saldos_apos, self.saldo_atual)
+
+    def definir_movimentacoes(self, datas: np.ndarray, tipos: np.ndarray,
+                              quantidades: np.ndarray, saldos_apos: np.ndarray):
+        """Substitui o histórico pelas colunas já calculadas"""
+        self.datas = datas
+        self.tipos = tipos
+        self.quantidades = quantidades
+        self.saldos_apos = saldos_apos
 
     @property
-    def total_saidas(self) -> float:
-        return sum(m.quantidade for m in self.movimentacoes if m.tipo == 'S')
+    def movimentacoes(self) -> List[Movimentacao]:
+        return [
+            Movimentacao(data, 'E' if tipo == 0 else 'S', quantidade, saldo)
+            for data, tipo, quantidade, saldo in zip(self.datas.astype('datetime64[us]').tolist(), self.tipos.tolist(),
+                                                     self.quantidades.tolist(), self.saldos_apos.tolist())
+        ]
 
 class ControladorEstoque:
     def __init__(self):
@@ -58,154 +141,315 @@ class ControladorEstoque:
         self.produto_base_descricao = "CARNE BOV RSF KG"
         self.entrada_total = 0.0
         self.entradas_por_data: Dict[datetime, float] = {}
-        self.movimentacoes_ordenadas = []
+        self.movimentacoes_ordenadas = np.empty(0, dtype=DTYPE_MOVIMENTACAO)
         self.tem_alertas_estoque = False
         
         # Carrega os dados
-        self.carregar_produtos_e_percentuais()
-        self.carregar_movimentacoes()
+        percentuais, entradas, vendas = self.ler_arquivos()
+        self.carregar_produtos_e_percentuais(percentuais)
+
+        # Vetores alinhados aos produtos para distribuir as entradas de uma só vez
+        self._codigos = np.fromiter(self.produtos, dtype=np.int64, count=len(self.produtos))
+        self._percentuais = np.array([p.percentual for p in self.produtos.values()], dtype=np.float64)
+        self._saldos = np.zeros_like(self._percentuais)
+        self._entradas_totais = np.zeros_like(self._percentuais)
+        self._saidas_totais = np.zeros_like(self._percentuais)
+        self._indices = {codigo: i for i, codigo in enumerate(self.produtos)}
+        # Histórico por produto é montado apenas quando um relatório o solicita
+        self._historicos_montados = set()
+        # Posições dos produtos que tiveram venda sem estoque durante o processamento
+        self._produtos_com_alerta = set()
+
+        self.carregar_movimentacoes(entradas, vendas)
         self.processar_movimentacoes()
 
-    def carregar_produtos_e_percentuais(self):
+    def ler_arquivos(self):
+        """Lê em paralelo os arquivos de percentuais, entradas e vendas"""
+        # arquivo_percentuais = 'data/setembro/percentuais.csv'
+        # arquivo_percentuais = 'data/setembro/ATUALIZADO.csv'
+        arquivo_percentuais = 'data/setembro/Setembro.csv'
+        # O parser do pandas libera o GIL, então as três leituras se sobrepõem
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            percentuais = executor.submit(self._ler_csv, arquivo_percentuais,
+                                          usecols=['SEQPRODUTO', 'DESCCOMPLETA', 'PERCENTUAL'],
+                                          dtype={'SEQPRODUTO': 'int64', 'DESCCOMPLETA': str, 'PERCENTUAL': 'float64'})
+            entradas = executor.submit(self._ler_csv, 'data/setembro/entradas.csv',
+                                       usecols=['DATA', 'QUANTIDADE'],
+                                       parse_dates=['DATA'], date_format='%d/%m/%y', dtype={'QUANTIDADE': 'float64'})
+            vendas = executor.submit(self._ler_csv, 'data/setembro/vendas.csv',
+                                     usecols=['DATA', 'SEQPRODUTO', 'QUANTIDADE'],
+                                     parse_dates=['DATA'], date_format='%d/%m/%y',
+                                     dtype={'SEQPRODUTO': 'int64', 'QUANTIDADE': 'float64'})
+            return percentuais.result(), entradas.result(), vendas.result()
+
+    @staticmethod
+    def _ler_csv(arquivo: str, **opcoes) -> pd.DataFrame:
+        """Lê um CSV no formato exportado (separador ';' e vírgula decimal)"""
+        # Só as colunas pedidas são convertidas, pelo pyarrow quando disponível. Textos como
+        # '', 'NA' ou 'null' seguem como texto (o pyarrow ignora na_filter, mas não keep_default_na)
+        return pd.read_csv(arquivo, sep=';', decimal=',', encoding='utf-8', keep_default_na=False,
+                           **LEITOR_CSV, **opcoes)
+
+    def carregar_produtos_e_percentuais(self, df: pd.DataFrame):
         """Carrega os produtos e seus percentuais de rendimento"""
-        # arquivo = 'data/setembro/percentuais.csv'
-        # arquivo = 'data/setembro/ATUALIZADO.csv'
-        arquivo = 'data/setembro/Setembro.csv'
-        with open(arquivo, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                codigo = int(row['SEQPRODUTO'])
-                descricao = row['DESCCOMPLETA']
-                percentual = float(row['PERCENTUAL'].replace(',', '.'))
-                self.produtos[codigo] = Produto(codigo, descricao, percentual)
-            print("Percentuais carregados com sucesso.")
-
-    def carregar_movimentacoes(self):
+        for codigo, descricao, percentual in zip(df['SEQPRODUTO'].tolist(), df['DESCCOMPLETA'].tolist(),
+                                                 df['PERCENTUAL'].tolist()):
+            self.produtos[codigo] = Produto(codigo, descricao, percentual)
+        # Ordem por código calculada uma vez; o dicionário mantém a ordem do arquivo
+        self._produtos_por_codigo = sorted(self.produtos.values(), key=attrgetter('codigo'))
+        print("Percentuais carregados com sucesso.")
+
+    def carregar_movimentacoes(self, df_entradas: pd.DataFrame, df_vendas: pd.DataFrame):
         """Carrega todas as movimentações (entradas e saídas) e ordena por data"""
+        # Garante DATA como datetime também em arquivos só com cabeçalho, que o leitor C deixa como texto
+        df_entradas['DATA'] = pd.to_datetime(df_entradas['DATA'], format='%d/%m/%y')
+        df_vendas['DATA'] = pd.to_datetime(df_vendas['DATA'], format='%d/%m/%y')
+
         # Carrega entradas
-        entradas = []
-        with open('data/setembro/entradas.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                data = datetime.strptime(row['DATA'], '%d/%m/%y')
-                quantidade = float(row['QUANTIDADE'].replace(',', '.'))
-                # Remove a hora da data para comparação
-                data_sem_hora = datetime(data.year, data.month, data.day)
-                entradas.append(('E', data, quantidade, None))
-                self.entrada_total += quantidade
-                self.entradas_por_data[data_sem_hora] = self.entradas_por_data.get(data_sem_hora, 0) + quantidade
-            print("Entradas carregadas com sucesso.")
-
-        # Carrega vendas
-        vendas = []
-        with open('data/setembro/vendas.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file, delimiter=';')
-            for row in reader:
-                data = datetime.strptime(row['DATA'], '%d/%m/%y')
-                codigo = int(row['SEQPRODUTO'])
-                quantidade = float(row['QUANTIDADE'].replace(',', '.'))
-                if codigo in self.produtos:
-                    vendas.append(('S', data, quantidade, codigo))
-            print("Vendas carregadas com sucesso.\n\n")
-
-        # Combina e ordena todas as movimentações por data
-        self.movimentacoes_ordenadas = sorted(entradas + vendas, key=lambda x: x[1])
+        entradas = np.empty(len(df_entradas), dtype=DTYPE_MOVIMENTACAO)
+        entradas['data'] = df_entradas['DATA'].to_numpy('datetime64[D]')
+        entradas['tipo'] = 0
+        entradas['quantidade'] = df_entradas['QUANTIDADE'].to_numpy(np.float64)
+        entradas['indice'] = -1
+        self.entrada_total = float(df_entradas['QUANTIDADE'].sum())
+        # Remove a hora da data para comparação
+        por_data = df_entradas.groupby(df_entradas['DATA'].dt.normalize())['QUANTIDADE'].sum()
+        self.entradas_por_data = dict(zip(por_data.index.to_numpy('datetime64[us]').tolist(), por_data.tolist()))
+        # Datas em ordem e soma acumulada, para somar as entradas até uma data com busca binária
+        self._datas_entrada = por_data.index.to_numpy('datetime64[D]')
+        self._entradas_acumuladas = np.cumsum(por_data.to_numpy(np.float64))
+        self._entradas_ate_dia: Dict[np.datetime64, float] = {}
+        print("Entradas carregadas com sucesso.")
+
+        # Carrega vendas, descartando produtos sem percentual cadastrado
+        indices = pd.Index(self._codigos).get_indexer(df_vendas['SEQPRODUTO'])
+        conhecidos = indices >= 0
+        vendas = np.empty(int(conhecidos.sum()), dtype=DTYPE_MOVIMENTACAO)
+        vendas['data'] = df_vendas['DATA'].to_numpy('datetime64[D]')[conhecidos]
+        vendas['tipo'] = 1
+        vendas['quantidade'] = df_vendas['QUANTIDADE'].to_numpy(np.float64)[conhecidos]
+        vendas['indice'] = indices[conhecidos]
+        print("Vendas carregadas com sucesso.\n\n")
+
+        # Combina e ordena por data. O sort estável (timsort) aproveita as sequências que
+        # já vêm ordenadas e mantém as entradas antes das vendas na mesma data
+        movimentacoes = np.concatenate([entradas, vendas])
+        self.movimentacoes_ordenadas = movimentacoes[np.argsort(movimentacoes['data'], kind='stable')]
+
+    def _data_movimentacao(self, posicao: int) -> datetime:
+        """Data da movimentação na posição informada, como datetime"""
+        return self.movimentacoes_ordenadas['data'][posicao].astype('datetime64[us]').item()
 
     def processar_movimentacoes(self):
         """Processa todas as movimentações em ordem cronológica"""
-        for tipo, data, quantidade, codigo in self.movimentacoes_ordenadas:
-            if tipo == 'E':
-                # Entrada do boi casado - distribui para os produtos
-                for produto in self.produtos.values():
-                    quantidade_derivada = (quantidade * produto.percentual) / 100
-                    produto.registrar_entrada(data, quantidade_derivada)
+        produtos = list(self.produtos.values())
+        # Os alertas são acumulados durante o processamento e impressos ao final
+        self._linhas_alerta = []
+        # O numba só é importado quando o volume compensa o custo de carregá-lo
+        laco = _laco_compilado() if len(self.movimentacoes_ordenadas) >= MIN_MOVIMENTACOES_COMPILADO else None
+        if laco is not None:
+            self._processar_compilado(produtos, laco)
+        else:
+            self._processar_por_blocos(produtos)
+        if self._linhas_alerta:
+            sys.stdout.write("\n".join(self._linhas_alerta) + "\n")
+
+        for produto, saldo, entradas, saidas in zip(produtos, self._saldos.tolist(),
+                                                    self._entradas_totais.tolist(), self._saidas_totais.tolist()):
+            produto.saldo_atual = saldo
+            produto.total_entradas = entradas
+            produto.total_saidas = saidas
+
+    def _processar_compilado(self, produtos, laco):
+        """Processa as movimentações com o laço compilado pelo numba"""
+        quantidades = np.ascontiguousarray(self.movimentacoes_ordenadas['quantidade'])
+        alertas, saldos = laco(
+            np.ascontiguousarray(self.movimentacoes_ordenadas['tipo']), quantidades,
+            np.ascontiguousarray(self.movimentacoes_ordenadas['indice']), self._percentuais,
+            self._saldos, self._entradas_totais, self._saidas_totais)
+
+        # A maior falta só muda nos alertas, que saem em ordem cronológica
+        indices = self.movimentacoes_ordenadas['indice']
+        for k, saldo in zip(alertas.tolist(), saldos.tolist()):
+            self._alertar_falta(produtos[indices[k]], k, float(quantidades[k]), saldo)
+
+    def _processar_por_blocos(self, produtos):
+        """Processa as movimentações em blocos consecutivos de entradas e de vendas"""
+        eh_entrada = self.movimentacoes_ordenadas['tipo'] == 0
+        quantidades = self.movimentacoes_ordenadas['quantidade']
+
+        limites = (np.flatnonzero(np.diff(eh_entrada)) + 1).tolist()
+        inicios = [0] + limites if len(eh_entrada) else []
+        for inicio, fim in zip(inicios, limites + [len(eh_entrada)]):
+            if eh_entrada[inicio]:
+                # Entrada do boi casado - distribui o bloco inteiro com um produto externo
+                # (entradas x produtos); a soma por colunas acumula linha a linha, na
+                # mesma ordem das entradas
+                derivadas = np.multiply.outer(quantidades[inicio:fim], self._percentuais) / 100
+                self._saldos[:] = np.vstack((self._saldos, derivadas)).sum(axis=0)
+                self._entradas_totais[:] = np.vstack((self._entradas_totais, derivadas)).sum(axis=0)
             else:
-                # Venda de produto específico
-                produto = self.produtos[codigo]
-                if not produto.registrar_saida(data, quantidade):
-                    print(f"ALERTA: Tentativa de venda sem estoque suficiente em {data.strftime('%d/%m/%y')}")
-                    print(f"Produto: {produto.codigo} - {produto.descricao}")
-                    print(f"Quantidade solicitada: {quantidade:.3f}")
-                    print(f"Saldo disponível: {produto.saldo_atual:.3f}")                   
-                    self.tem_alertas_estoque = True
-
-                    if produto.maior_falta_estoque > produto.saldo_atual:
-                        produto.maior_falta_estoque = produto.saldo_atual
-                        produto.data_maior_falta_estoque = data
-                        print(f"Quantidade ajustada para o produto: {produto.maior_falta_estoque:.3f} kg")
-                    print() 
+                self._processar_vendas(produtos, inicio, fim)
+
+    def _processar_vendas(self, produtos, inicio: int, fim: int):
+        """Processa um bloco de vendas consecutivas, emitindo os alertas de estoque insuficiente"""
+        lote = self.movimentacoes_ordenadas[inicio:fim]
+        lote_quantidades = lote['quantidade']
+        lote_indices = lote['indice']
+        afetados = np.unique(lote_indices)
+        saldos_anteriores = self._saldos[afetados]
+        saidas_anteriores = self._saidas_totais[afetados]
+
+        np.subtract.at(self._saldos, lote_indices, lote_quantidades)
+        np.add.at(self._saidas_totais, lote_indices, lote_quantidades)
+        # Sem quantidades negativas o saldo só diminui dentro do bloco: se nenhum
+        # produto terminou negativo, nenhuma venda ficou sem estoque
+        if (self._saldos[afetados] >= 0).all() and (lote_quantidades >= 0).all():
+            return
+
+        # Caso raro: refaz o bloco venda a venda para alertar na ordem cronológica
+        self._saldos[afetados] = saldos_anteriores
+        self._saidas_totais[afetados] = saidas_anteriores
+        for k, quantidade, indice in zip(range(inicio, fim), lote_quantidades.tolist(), lote_indices.tolist()):
+            # Venda de produto específico
+            produto = produtos[indice]
+            saldo_disponivel = self._saldos[indice]
+            self._saldos[indice] -= quantidade
+            self._saidas_totais[indice] += quantidade
+            if quantidade > saldo_disponivel:
+                self._alertar_falta(produto, k, quantidade, float(self._saldos[indice]))
+
+    def _alertar_falta(self, produto, posicao: int, quantidade: float, saldo: float):
+        """Registra a maior falta do produto e emite o alerta de venda sem estoque"""
+        ajustou = produto.maior_falta_estoque > saldo
+        if ajustou:
+            produto.maior_falta_estoque = saldo
+            produto.data_maior_falta_estoque = self._data_movimentacao(posicao)
+        self._emitir_alerta(produto, posicao, quantidade, saldo, ajustou)
+
+    def _emitir_alerta(self, produto, posicao: int, quantidade: float, saldo: float, ajustou: bool):
+        """Registra as linhas do alerta de venda sem estoque"""
+        data = self._data_movimentacao(posicao)
+        linhas = self._linhas_alerta
+        linhas.append(f"ALERTA: Tentativa de venda sem estoque suficiente em {data.strftime('%d/%m/%y')}")
+        linhas.append(f"Produto: {produto.codigo} - {produto.descricao}")
+        linhas.append(f"Quantidade solicitada: {quantidade:.3f}")
+        linhas.append(f"Saldo disponível: {saldo:.3f}")                   
+        self.tem_alertas_estoque = True
+        self._produtos_com_alerta.add(self._indices[produto.codigo])
+
+        if ajustou:
+            linhas.append(f"Quantidade ajustada para o produto: {saldo:.3f} kg")
+        linhas.append("") 
+
+    def _montar_movimentacoes(self, produtos):
+        """Monta sob demanda o histórico dos produtos a partir das movimentações ordenadas"""
+        datas = self.movimentacoes_ordenadas['data']
+        tipos = self.movimentacoes_ordenadas['tipo']
+        entradas = tipos == 0
+        quantidades = self.movimentacoes_ordenadas['quantidade']
+        indices = self.movimentacoes_ordenadas['indice']
+
+        for produto in produtos:
+            if produto.codigo in self._historicos_montados:
+                continue
+            # Usa o percentual vigente no processamento, não o ajustado pelos relatórios
+            indice = self._indices[produto.codigo]
+            selecao = np.flatnonzero(entradas | (indices == indice))
+            eh_entrada = entradas[selecao]
+            quantidade = np.where(eh_entrada, quantidades[selecao] * self._percentuais[indice] / 100,
+                                  quantidades[selecao])
+            # Acumula a partir de 0.0, como o saldo inicial: uma primeira venda de 0 kg dá 0.0, não -0.0
+            saldo = np.cumsum(np.concatenate(([0.0], np.where(eh_entrada, quantidade, -quantidade))))[1:]
+            produto.definir_movimentacoes(datas[selecao], tipos[selecao], quantidade, saldo)
+            self._historicos_montados.add(produto.codigo)
+
+    def historico(self, codigo: int) -> Produto:
+        """Produto com o histórico de movimentações montado na primeira consulta"""
+        produto = self.produtos[codigo]
+        self._montar_movimentacoes([produto])
+        return produto
     
     def gerar_relatorio_analises(self):
         """Gera um relatório completo do estoque"""
-        print("\nRELATÓRIO DE ESTOQUE - CARNES BOVINAS")
-        print("=" * 100)
+        # O relatório é montado em memória e escrito de uma só vez
+        linhas = []
+        linhas.append("\nRELATÓRIO DE ESTOQUE - CARNES BOVINAS")
+        linhas.append("=" * 100)
         
         # Informações do produto base
-        print("\nPRODUTO BASE:")
-        print(f"Código: {self.produto_base_codigo}")
-        print(f"Descrição: {self.produto_base_descricao}")
-        print(f"Quantidade Total Entrada: {self.entrada_total:.3f} kg")
+        linhas.append("\nPRODUTO BASE:")
+        linhas.append(f"Código: {self.produto_base_codigo}")
+        linhas.append(f"Descrição: {self.produto_base_descricao}")
+        linhas.append(f"Quantidade Total Entrada: {self.entrada_total:.3f} kg")
         
         # Informações dos produtos derivados
-        print("\nPRODUTOS DERIVADOS:")
-        print("-" * 100)
-        print(f"{'Código':<10} {'Descrição':<40} {'Percentual':<10} {'Entradas':<12} {'Saídas':<12} {'Saldo':<12}")
-        print("-" * 100)
+        linhas.append("\nPRODUTOS DERIVADOS:")
+        linhas.append("-" * 100)
+        linhas.append(f"{'Código':<10} {'Descrição':<40} {'Percentual':<10} {'Entradas':<12} {'Saídas':<12} {'Saldo':<12}")
+        linhas.append("-" * 100)
         
         total_percentual = 0
         total_entradas = 0
         total_saidas = 0
         total_saldo = 0
         
-        for produto in sorted(self.produtos.values(), key=lambda x: x.codigo):
-            print(f"{produto.codigo:<10} "
-                  f"{produto.descricao[:40]:<40} "
-                  f"{produto.percentual:>9.2f}% "
-                  f"{produto.total_entradas:>11.2f} "
-                  f"{produto.total_saidas:>11.2f} "
-                  f"{produto.saldo_atual:>11.2f}")
+        for produto in self._produtos_por_codigo:
+            linhas.append(f"{produto.codigo:<10} "
+                          f"{produto.descricao[:40]:<40} "
+                          f"{produto.percentual:>9.2f}% "
+                          f"{produto.total_entradas:>11.2f} "
+                          f"{produto.total_saidas:>11.2f} "
+                          f"{produto.saldo_atual:>11.2f}")
             
             total_percentual += produto.percentual
             total_entradas += produto.total_entradas
             total_saidas += produto.total_saidas
             total_saldo += produto.saldo_atual
         
-        print("-" * 100)
-        print(f"{'TOTAL':<51} "
-              f"{total_percentual:>9.2f}% "
-              f"{total_entradas:>11.2f} "
-              f"{total_saidas:>11.2f} "
-              f"{total_saldo:>11.2f}")
+        linhas.append("-" * 100)
+        linhas.append(f"{'TOTAL':<51} "
+                      f"{total_percentual:>9.2f}% "
+                      f"{total_entradas:>11.2f} "
+                      f"{total_saidas:>11.2f} "
+                      f"{total_saldo:>11.2f}")
         
-        # Encontra o produto com maior saldo
-        produto_maior_saldo = max(self.produtos.values(), key=lambda p: p.saldo_atual)
-        print("\nPRODUTO COM MAIOR SALDO:")
-        print(f"Código: {produto_maior_saldo.codigo}")
-        print(f"Descrição: {produto_maior_saldo.descricao}")
-        print(f"Saldo atual: {produto_maior_saldo.saldo_atual:.3f} kg")
+        # Encontra o produto com maior saldo (argmax devolve o primeiro, como max)
+        produtos = list(self.produtos.values())
+        produto_maior_saldo = produtos[int(np.argmax(self._saldos))]
+        linhas.append("\nPRODUTO COM MAIOR SALDO:")
+        linhas.append(f"Código: {produto_maior_saldo.codigo}")
+        linhas.append(f"Descrição: {produto_maior_saldo.descricao}")
+        linhas.append(f"Saldo atual: {produto_maior_saldo.saldo_atual:.3f} kg")
 
         # Validações e alertas
-        print("\nVALIDAÇÕES E ALERTAS:")
+        linhas.append("\nVALIDAÇÕES E ALERTAS:")
         if abs(total_percentual - 100) > 0.01:
-            print(f"ALERTA: Soma dos percentuais ({total_percentual:.3f}%) não totaliza 100%")
+            linhas.append(f"ALERTA: Soma dos percentuais ({total_percentual:.3f}%) não totaliza 100%")
 
-        produtos_negativos = [p for p in self.produtos.values() if p.saldo_atual < 0]
+        produtos_negativos = [produtos[i] for i in np.flatnonzero(self._saldos < 0).tolist()]
         if produtos_negativos:
-            print("\nALERTA: Produtos com saldo negativo:")
+            linhas.append("\nALERTA: Produtos com saldo negativo:")
             for produto in produtos_negativos:
-                print(f"- {produto.codigo} {produto.descricao}: {produto.saldo_atual:.3f} kg")
+                linhas.append(f"- {produto.codigo} {produto.descricao}: {produto.saldo_atual:.3f} kg")
         
-        produtos_tentativa_negativa = [p for p in self.produtos.values() if p.maior_falta_estoque < 0]
-
-        if produtos_tentativa_negativa:
-            print("\nALERTA: Produtos com tentativas de venda com estoque insuficiente:")
-            for produto in produtos_tentativa_negativa:
-                print(f"- {produto.codigo} {produto.descricao}")
-                print(f"  Total de quantidade faltante: {produto.maior_falta_estoque:.3f} kg")
-                print(f"  Data da maior falta de estoque: {produto.data_maior_falta_estoque.strftime('%d/%m/%y')}")
-                percentual_falta = self.calcula_percentual_falta(produto, produto.data_maior_falta_estoque)
-                produto_maior_saldo.percentual -= percentual_falta
-                print(f"  Percentual de falta: {percentual_falta}%\n")
+        # Só os produtos que geraram alerta podem ter falta registrada
+        produtos_tentativa_negativa = [produtos[i] for i in sorted(self._produtos_com_alerta)
+                                       if produtos[i].maior_falta_estoque < 0]
+
+        try:
+            if produtos_tentativa_negativa:
+                linhas.append("\nALERTA: Produtos com tentativas de venda com estoque insuficiente:")
+                for produto in produtos_tentativa_negativa:
+                    linhas.append(f"- {produto.codigo} {produto.descricao}")
+                    linhas.append(f"  Total de quantidade faltante: {produto.maior_falta_estoque:.3f} kg")
+                    linhas.append(f"  Data da maior falta de estoque: {produto.data_maior_falta_estoque.strftime('%d/%m/%y')}")
+                    percentual_falta = self.calcula_percentual_falta(produto, produto.data_maior_falta_estoque)
+                    produto_maior_saldo.percentual -= percentual_falta
+                    linhas.append(f"  Percentual de falta: {percentual_falta}%\n")
+        finally:
+            # Sem entradas até a data da falta a divisão falha; o relatório parcial é escrito antes
+            sys.stdout.write("\n".join(linhas) + "\n")
 
     def calcula_percentual_falta(self, produto, data_limite: datetime) -> float:
         """
@@ -233,19 +477,16 @@ class ControladorEstoque:
         Returns:
             float: Soma total das entradas anteriores à data especificada
         """
-        # Normaliza a data removendo a hora para comparação consistente
-        if isinstance(data_limite, datetime):
-            data_limite_sem_hora = datetime(data_limite.year, data_limite.month, data_limite.day)
-        else:
-            # Se a data for fornecida em outro formato, tenta convertê-la
-            data_limite_sem_hora = data_limite
+        # A conversão para dia descarta a hora, sem montar um datetime intermediário
+        dia_limite = np.datetime64(data_limite, 'D')
         
-        # Soma todas as entradas anteriores à data limite
-        total_entradas = 0.0
-        for data, quantidade in self.entradas_por_data.items():
-            if data <= data_limite_sem_hora:
-                total_entradas += quantidade
-                
+        # Vários produtos costumam ter a maior falta no mesmo dia
+        total_entradas = self._entradas_ate_dia.get(dia_limite)
+        if total_entradas is None:
+            # Soma todas as entradas anteriores à data limite
+            posicao = int(np.searchsorted(self._datas_entrada, dia_limite, side='right'))
+            total_entradas = float(self._entradas_acumuladas[posicao - 1]) if posicao else 0.0
+            self._entradas_ate_dia[dia_limite] = total_entradas
         return total_entradas
 
     def gerar_relatorio_movimentacoes(self, codigo_produto: int = None):
@@ -255,27 +496,39 @@ class ControladorEstoque:
             return
  
         produtos = [self.produtos[codigo_produto]] if codigo_produto else self.produtos.values()
+        self._montar_movimentacoes(produtos)
          
+        linhas = []
         for produto in produtos:
-            print(f"\nMOVIMENTAÇÕES - {produto.codigo} {produto.descricao}")
-            print("=" * 80)
-            print(f"{'Data':<12} {'Tipo':<8} {'Quantidade':>12} {'Saldo':>12}")
-            print("-" * 80)
+            linhas.append(f"\nMOVIMENTAÇÕES - {produto.codigo} {produto.descricao}")
+            linhas.append("=" * 80)
+            linhas.append(f"{'Data':<12} {'Tipo':<8} {'Quantidade':>12} {'Saldo':>12}")
+            linhas.append("-" * 80)
              
-            for mov in produto.movimentacoes:
-                tipo = "Entrada" if mov.tipo == 'E' else "Saída"
-                print(f"{mov.data.strftime('%Y-%m-%d'):<12} "
-                      f"{tipo:<8} "
-                      f"{mov.quantidade:>12.2f} "
-                      f"{mov.saldo_apos:>12.3f}")
+            # Datas formatadas de uma vez pelo NumPy (AAAA-MM-DD), sem strftime por linha
+            datas = np.datetime_as_string(produto.datas, unit='D').tolist()
+            for data, tipo, quantidade, saldo in zip(datas, produto.tipos.tolist(),
+                                                     produto.quantidades.tolist(), produto.saldos_apos.tolist()):
+                tipo = "Entrada" if tipo == 0 else "Saída"
+                linhas.append(f"{data:<12} "
+                              f"{tipo:<8} "
+                              f"{quantidade:>12.2f} "
+                              f"{saldo:>12.3f}")
+        if linhas:
+            sys.stdout.write("\n".join(linhas) + "\n")
 
     def imprime_percentuais_atualizados(self):
-        with open("data/setembro/ATUALIZADO.csv", mode='w', newline='', encoding='utf-8') as arquivo:
-            writer = csv.writer(arquivo, delimiter=';')
-            writer.writerow(["SEQPRODUTO", "DESCCOMPLETA", "PERCENTUAL"])
-            for produto in self.produtos.values():
-                percentual = produto.percentual_ideal if produto.percentual_ideal > 0.0 else produto.percentual
-                writer.writerow([produto.codigo, produto.descricao, f"{percentual:.2f}".replace('.', ',')])
+        produtos = list(self.produtos.values())
+        ideais = np.array([p.percentual_ideal for p in produtos], dtype=np.float64)
+        atuais = np.array([p.percentual for p in produtos], dtype=np.float64)
+        df = pd.DataFrame({
+            "SEQPRODUTO": [p.codigo for p in produtos],
+            "DESCCOMPLETA": [p.descricao for p in produtos],
+            "PERCENTUAL": np.where(ideais > 0.0, ideais, atuais),
+        })
+        # Mesmo formato do csv.writer anterior: ';', vírgula decimal e fim de linha \r\n
+        df.to_csv("data/setembro/ATUALIZADO.csv", sep=';', decimal=',', float_format='%.2f',
+                  index=False, encoding='utf-8', lineterminator='\r\n')
 
 
 if __name__ == "__main__":